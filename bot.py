@@ -4,7 +4,7 @@ Uses modular architecture with secure components
 """
 
 import logging
-import openai
+from openai import AsyncOpenAI
 import requests
 from bs4 import BeautifulSoup
 from urllib.parse import urlparse, urljoin
@@ -17,9 +17,6 @@ from translations import get_text
 from storage import storage
 from utils import rate_limit, sanitize_input, scraper, advanced_sanitize_input, validate_url_security, generate_secure_hashtags, create_mastodon_poster
 
-# Configure OpenAI
-openai.api_key = config.openai_api_key
-
 logger = logging.getLogger(__name__)
 
 class PromoBot:
@@ -28,6 +25,9 @@ class PromoBot:
     def __init__(self):
         self.application = Application.builder().token(config.telegram_token).build()
         
+        # Single async OpenAI client shared by all handlers; bounded so a slow call can't stall a user
+        self.oai = AsyncOpenAI(api_key=config.openai_api_key, timeout=20.0)
+        
         # Initialize Mastodon poster if configured
         self.mastodon_poster = None
         if config.has_mastodon_config():
@@ -348,7 +348,7 @@ class PromoBot:
             if callback_data == 'main_menu':
                 await self.show_main_menu(query, context)
             elif callback_data.startswith('lang_'):
-                lang = callback_data.split('_')[1]
+                lang = callback_data.rpartition('_')[2]
                 if lang in ['en', 'ru', 'ro']:
                     context.user_data['language'] = lang
                     storage.save_user_data(user.id, context.user_data)
@@ -368,7 +368,7 @@ class PromoBot:
                 await self.show_my_products(query, context)
             elif callback_data.startswith('product_'):
                 try:
-                    product_index = int(callback_data.split('_')[1])
+                    product_index = int(callback_data.rpartition('_')[2])
                     if 0 <= product_index < len(context.user_data.get('products', [])):
                         await self.show_product_detail(query, context, product_index)
                 except (ValueError, IndexError):
@@ -385,19 +385,19 @@ class PromoBot:
                 await self.show_promo_from_product(query, context)
             elif callback_data.startswith('select_product_'):
                 try:
-                    product_index = int(callback_data.split('_')[2])
+                    product_index = int(callback_data.rpartition('_')[2])
                     await self.generate_product_promo(query, context, product_index)
                 except (ValueError, IndexError):
                     pass
             elif callback_data.startswith('gen_promo_'):
                 try:
-                    product_index = int(callback_data.split('_')[2])
+                    product_index = int(callback_data.rpartition('_')[2])
                     await self.generate_product_promo(query, context, product_index)
                 except (ValueError, IndexError):
                     pass
             elif callback_data.startswith('delete_product_'):
                 try:
-                    product_index = int(callback_data.split('_')[2])
+                    product_index = int(callback_data.rpartition('_')[2])
                     await self.delete_product(query, context, product_index)
                 except (ValueError, IndexError):
                     pass
@@ -430,7 +430,7 @@ class PromoBot:
             elif callback_data == 'translate_text':
                 await self.translate_generated_text(query, context)
             elif callback_data.startswith('translate_to_'):
-                lang = callback_data.split('_')[2]
+                lang = callback_data.rpartition('_')[2]
                 await self.perform_translation(query, context, lang)
             elif callback_data == 'edit_generated_text':
                 await self.edit_generated_text(query, context)
@@ -527,7 +527,7 @@ class PromoBot:
                 system_prompt = self.get_text('system_prompt', context)
                 
                 # Generate promotional text with OpenAI
-                response = await openai.ChatCompletion.acreate(
+                response = await self.oai.chat.completions.create(
                     model="gpt-3.5-turbo",
                     messages=[
                         {"role": "system", "content": system_prompt},
@@ -871,7 +871,7 @@ class PromoBot:
             system_prompt = self.get_text('system_prompt', context)
             prompt = self.get_text('openai_prompt', context, product_info, product_info)
 
-            response = openai.ChatCompletion.create(
+            response = await self.oai.chat.completions.create(
                 model="gpt-3.5-turbo",
                 messages=[
                     {"role": "system", "content": system_prompt},
@@ -1197,14 +1197,10 @@ class PromoBot:
             if bot_member.status not in ['administrator', 'creator']:
                 return False, "Bot is not an administrator in this channel/group"
             
-            # Check if bot can post messages
-            if hasattr(bot_member, 'can_post_messages') and not bot_member.can_post_messages:
+            # Check if bot can post messages (only set for channels; group admins can always post)
+            if getattr(bot_member, 'can_post_messages', None) is False:
                 return False, "Bot doesn't have permission to post messages"
             
-            # Send test message and delete it
-            test_msg = await context.bot.send_message(f"@{channel_id}", "🤖 Bot verification test - this message will be deleted")
-            await context.bot.delete_message(f"@{channel_id}", test_msg.message_id)
-            
             return True, "permissions_verified"
             
         except Exception as e:
@@ -1517,7 +1513,7 @@ class PromoBot:
             target_language_names = {'en': 'English', 'ru': 'Russian', 'ro': 'Romanian'}
             target_name = target_language_names.get(target_lang, 'English')
             
-            response = openai.ChatCompletion.create(
+            response = await self.oai.chat.completions.create(
                 model="gpt-3.5-turbo",
                 messages=[
                     {"role": "system", "content": f"You are a professional translator. Translate the following promotional text to {target_name} while maintaining the marketing tone and persuasiveness."},
@@ -1805,5 +1801,12 @@ class PromoBot:
 
     def run(self):
         """Run the bot."""
+        # Use uvloop's faster event loop where available (not on Windows)
+        try:
+            import uvloop
+            uvloop.install()
+        except ImportError:
+            logger.info("uvloop not available, using the default asyncio event loop")
+        
         logger.info("🤖 Bot is running...")
         self.application.run_polling(allowed_updates=Update.ALL_TYPES) 
\ No newline at end of file
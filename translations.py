@@ -549,6 +549,28 @@ TRANSLATIONS = {
     }
 }
 
+# Flat (language, key) -> text table with the English fallback already applied,
+# so a get_text hit is a single dict lookup
+_FLAT_TRANSLATIONS = {
+    (language, key): text
+    for language in TRANSLATIONS
+    for key, text in {**TRANSLATIONS['en'], **TRANSLATIONS[language]}.items()
+}
+
+def _resolve_text(key, language):
+    """Slow path of get_text: validate the inputs, then look up with English fallback."""
+    # Input validation for security
+    if not isinstance(key, str) or not isinstance(language, str):
+        language = 'en'
+        key = 'general_error'
+    
+    # Sanitize language code
+    language = language.lower().strip()
+    if language not in TRANSLATIONS:
+        language = 'en'
+    
+    return _FLAT_TRANSLATIONS.get((language, key), f"Missing translation: {key}")
+
 def get_text(key: str, language: str, *args) -> str:
     """
     Safely get translated text with input validation.
@@ -561,18 +583,13 @@ def get_text(key: str, language: str, *args) -> str:
     Returns:
         Translated text or fallback to English
     """
-    # Input validation for security
-    if not isinstance(key, str) or not isinstance(language, str):
-        language = 'en'
-        key = 'general_error'
-    
-    # Sanitize language code
-    language = language.lower().strip()
-    if language not in TRANSLATIONS:
-        language = 'en'
-    
-    # Get translation with fallback
-    text = TRANSLATIONS[language].get(key, TRANSLATIONS['en'].get(key, f"Missing translation: {key}"))
+    # Well-formed (language, key) pairs hit the flat table directly
+    try:
+        text = _FLAT_TRANSLATIONS.get((language, key))
+    except TypeError:  # Unhashable key or language
+        text = None
+    if text is None:
+        text = _resolve_text(key, language)
     
     # Safe string formatting
     if args:
@@ -580,5 +597,4 @@ def get_text(key: str, language: str, *args) -> str:
             return text.format(*args)
         except (ValueError, IndexError, KeyError):
             return text
-    
-    return text 
\ No newline at end of file
+    return text
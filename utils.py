@@ -1,5 +1,9 @@
 import re
+import asyncio
+import threading
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from bs4 import BeautifulSoup
 from urllib.parse import urlparse, urljoin
 import logging
@@ -250,16 +254,9 @@ class SecureWebScraper:
     """Enhanced secure web scraping with comprehensive security measures."""
     
     def __init__(self):
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.5',
-            'Accept-Encoding': 'gzip, deflate',
-            'DNT': '1',
-            'Connection': 'keep-alive',
-            'Upgrade-Insecure-Requests': '1'
-        })
+        # Fetches run in executor threads and requests.Session is not thread-safe,
+        # so each thread gets its own pooled session (see `session`)
+        self._local = threading.local()
         self.timeout = 15
         self.max_content_length = 10 * 1024 * 1024  # 10MB limit
         self.max_redirects = 5
@@ -268,6 +265,32 @@ class SecureWebScraper:
         self.last_request_time = 0
         self.min_request_interval = 1.0  # Minimum 1 second between requests
     
+    @property
+    def session(self) -> requests.Session:
+        """This thread's session, with keep-alive connections and a couple of retries on gateway errors."""
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=50,
+                pool_maxsize=4,  # One request at a time per thread
+                # Hand back the last 5xx response once retries run out, so
+                # raise_for_status() reports it as an HTTPError
+                max_retries=Retry(total=2, backoff_factor=0.2, status_forcelist=[502, 503, 504], raise_on_status=False)
+            )
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            session.headers.update({
+                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+                'Accept-Language': 'en-US,en;q=0.5',
+                'Accept-Encoding': 'gzip, deflate',
+                'DNT': '1',
+                'Connection': 'keep-alive',
+                'Upgrade-Insecure-Requests': '1'
+            })
+        return session
+    
     def _rate_limit_request(self):
         """Implement rate limiting for requests."""
         current_time = time.time()
@@ -297,6 +320,11 @@ class SecureWebScraper:
             logger.warning(f"URL security validation failed: {error_msg}")
             return None, f"Security check failed: {error_msg}"
         
+        # The blocking fetch and parse run in a worker thread so the event loop stays free
+        return await asyncio.get_running_loop().run_in_executor(None, self._fetch_and_parse, url)
+    
+    def _fetch_and_parse(self, url: str) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        """Fetch and parse an already validated product URL (blocking)."""
         # Rate limit requests
         self._rate_limit_request()
         